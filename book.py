@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List, Optional
+from catalog import PackedCatalog
 from storage import BookStorage
 
 class LibraryItem(ABC):
@@ -11,7 +12,9 @@ class LibraryItem(ABC):
         item_id (str): The unique identifier for the item (e.g., ISBN for books).
         is_available (bool): Availability status of the item.
     """
-    
+
+    __slots__ = ("title", "item_id", "is_available")
+
     def __init__(self, title: str, item_id: str):
         """
         Initialize a new library item.
@@ -53,6 +56,8 @@ class Book(LibraryItem):
         isbn (str): The ISBN number of the book (used as item_id).
     """
 
+    __slots__ = ("author", "_search_blob")
+
     def __init__(self, title: str, author: str, isbn: str):
         """
         Initialize a new Book.
@@ -64,6 +69,13 @@ class Book(LibraryItem):
         """
         super().__init__(title, isbn)
         self.author = author
+        self._refresh_search_blob()
+
+    def _refresh_search_blob(self) -> None:
+        """
+        Recompute the lower-cased title, author and ISBN matched by BookManager.search_books.
+        """
+        self._search_blob = f"{self.title}\0{self.author}\0{self.item_id}".lower()
 
     def to_dict(self) -> dict:
         """
@@ -110,7 +122,9 @@ class BookManager:
 
     Attributes:
         storage (BookStorage): The storage handler for book data.
-        books (List[Book]): List of books managed by the BookManager.
+        _by_isbn (Dict[str, Book]): The managed books keyed by ISBN, in insertion order.
+        _catalog (Optional[PackedCatalog[Book]]): Packed search text of all books, or None
+            until the next search after the inventory changes.
     """
 
     def __init__(self):
@@ -118,7 +132,8 @@ class BookManager:
         Initialize the BookManager with existing books loaded from storage.
         """
         self.storage = BookStorage()
-        self.books = [Book.from_dict(book) for book in self.storage.load_books()]
+        self._by_isbn = {book["isbn"]: Book.from_dict(book) for book in self.storage.load_books()}
+        self._catalog: Optional[PackedCatalog[Book]] = None
 
     def add_book(self, title: str, author: str, isbn: str) -> None:
         """
@@ -132,11 +147,12 @@ class BookManager:
         Raises:
             ValueError: If a book with the same ISBN already exists.
         """
-        if self.get_book_by_isbn(isbn):
+        if isbn in self._by_isbn:
             raise ValueError(f"Book with ISBN {isbn} already exists")
         book = Book(title, author, isbn)
-        self.books.append(book)
-        self._save_books()
+        self._by_isbn[isbn] = book
+        self._catalog = None
+        self._log_book("add", book)
 
     def get_book_by_isbn(self, isbn: str) -> Optional[Book]:
         """
@@ -148,7 +164,7 @@ class BookManager:
         Returns:
             Optional[Book]: The book if found, None otherwise.
         """
-        return next((book for book in self.books if book.item_id == isbn), None)
+        return self._by_isbn.get(isbn)
 
     def update_book(self, isbn: str, title: str = None, author: str = None) -> None:
         """
@@ -169,7 +185,9 @@ class BookManager:
             book.title = title
         if author:
             book.author = author
-        self._save_books()
+        book._refresh_search_blob()
+        self._catalog = None
+        self._log_book("upd", book)
 
     def delete_book(self, isbn: str) -> None:
         """
@@ -181,11 +199,11 @@ class BookManager:
         Raises:
             ValueError: If the book with the given ISBN is not found.
         """
-        book = self.get_book_by_isbn(isbn)
+        book = self._by_isbn.pop(isbn, None)
         if not book:
             raise ValueError(f"Book with ISBN {isbn} not found")
-        self.books.remove(book)
-        self._save_books()
+        self._catalog = None
+        self._log_book("del", book)
 
     def list_books(self) -> List[Book]:
         """
@@ -194,7 +212,7 @@ class BookManager:
         Returns:
             List[Book]: A list of all Book objects in the library.
         """
-        return self.books
+        return list(self._by_isbn.values())
 
     def search_books(self, query: str) -> List[Book]:
         """
@@ -207,10 +225,44 @@ class BookManager:
             List[Book]: A list of books that match the search criteria.
         """
         query = query.lower()
-        return [book for book in self.books if query in book.title.lower() or query in book.author.lower() or query in book.item_id.lower()]
+        if not query:
+            return list(self._by_isbn.values())
+        if "\0" in query:
+            # The search blobs and the catalog separate the fields with NULs, so such a
+            # query is matched against each field on its own
+            return [
+                book for book in self._by_isbn.values()
+                if query in book.title.lower() or query in book.author.lower() or query in book.item_id.lower()
+            ]
+        return self._search_catalog().find(query)
+
+    def _search_catalog(self) -> PackedCatalog[Book]:
+        """
+        Return the packed search text of all books, building it if the inventory has changed.
+
+        Returns:
+            PackedCatalog[Book]: The search blobs of all books, in insertion order.
+        """
+        if self._catalog is None:
+            self._catalog = PackedCatalog(self._by_isbn.values(), lambda book: book._search_blob)
+        return self._catalog
+
+    def _log_book(self, op: str, book: Book) -> None:
+        """
+        Record a change to a single book in storage, saving all books once the change log grows too large.
+
+        Args:
+            op (str): The kind of change: "add", "upd" or "del".
+            book (Book): The changed book.
+        """
+        self.storage.append_record(op, book.item_id, book if op != "del" else None)
+        if self.storage.needs_compaction():
+            self._save_books()
 
     def _save_books(self):
         """
         Save the current list of books to storage.
+
+        The Book objects are handed to storage as-is and converted by the JSON encoder.
         """
-        self.storage.save_books([book.to_dict() for book in self.books])
+        self.storage.save_books(list(self._by_isbn.values()))
@@ -0,0 +1,60 @@
+from bisect import bisect_right
+from typing import Callable, Generic, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+class PackedCatalog(Generic[T]):
+    """
+    The search text of a sequence of items packed into one string, for substring search.
+
+    Scanning the packed string with str.find runs the per-item loop in C; each hit is
+    mapped back to its item with a binary search over the item start offsets.
+
+    Attributes:
+        text (str): The search text of all items, separated by NULs.
+        starts (List[int]): The offset in text at which each item's search text starts.
+        items (List[T]): The items, in the same order as their search text.
+    """
+
+    __slots__ = ("text", "starts", "items")
+
+    def __init__(self, items: Iterable[T], text_of: Callable[[T], str]):
+        """
+        Pack the search text of the given items.
+
+        Args:
+            items (Iterable[T]): The items to search, in the order results are returned.
+            text_of (Callable[[T], str]): Returns the lower-cased search text of an item.
+        """
+        self.items = list(items)
+        texts = [text_of(item) for item in self.items]
+        self.starts = []
+        offset = 0
+        for text in texts:
+            self.starts.append(offset)
+            offset += len(text) + 1
+        self.text = "\0".join(texts)
+
+    def find(self, query: str) -> List[T]:
+        """
+        Return the items whose search text contains the query, each at most once.
+
+        Args:
+            query (str): The lower-cased query. Must be non-empty and contain no NUL, so
+                that a match cannot span the separator between two items.
+
+        Returns:
+            List[T]: The matching items, in catalog order.
+        """
+        # Scan the whole catalog and map each hit back to its item, resuming the
+        # scan at the start of the next item
+        matches = []
+        starts = self.starts
+        position = self.text.find(query)
+        while position != -1:
+            index = bisect_right(starts, position) - 1
+            matches.append(self.items[index])
+            if index + 1 == len(starts):
+                break
+            position = self.text.find(query, starts[index + 1])
+        return matches
@@ -1,9 +1,24 @@
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from book import BookManager
 from user import UserManager
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from storage import BookStorage, UserStorage, CheckoutStorage
 
+def _to_datetime(value: Union[int, str]) -> datetime:
+    """
+    Convert a stored checkout timestamp to a datetime.
+
+    Args:
+        value (Union[int, str]): Epoch seconds, or an ISO 8601 string as written by older data files.
+
+    Returns:
+        datetime: The corresponding local datetime.
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return datetime.fromtimestamp(value)
+
 class Checkout:
     """
     Represents a checkout transaction for a library system.
@@ -16,6 +31,8 @@ class Checkout:
         return_date (Optional[datetime]): The date when the item was returned, if returned.
     """
 
+    __slots__ = ("user_id", "item_id", "checkout_date", "due_date", "return_date")
+
     def __init__(self, user_id: str, item_id: str, checkout_date: datetime = None, due_date: datetime = None):
         """
         Initialize a Checkout object.
@@ -40,7 +57,7 @@ class Checkout:
 
     def to_dict(self) -> dict:
         """
-        Convert the Checkout object to a dictionary for storage.
+        Convert the Checkout object to a dictionary for storage, with dates as integer epoch seconds.
 
         Returns:
             dict: A dictionary representation of the Checkout object.
@@ -48,9 +65,9 @@ class Checkout:
         return {
             "user_id": self.user_id,
             "item_id": self.item_id,
-            "checkout_date": self.checkout_date.isoformat(),
-            "due_date": self.due_date.isoformat(),
-            "return_date": self.return_date.isoformat() if self.return_date else None
+            "checkout_date": int(self.checkout_date.timestamp()),
+            "due_date": int(self.due_date.timestamp()),
+            "return_date": int(self.return_date.timestamp()) if self.return_date else None
         }
 
     @classmethod
@@ -67,11 +84,11 @@ class Checkout:
         checkout = cls(
             data["user_id"],
             data["item_id"],
-            datetime.fromisoformat(data["checkout_date"]),
-            datetime.fromisoformat(data["due_date"])
+            _to_datetime(data["checkout_date"]),
+            _to_datetime(data["due_date"])
         )
         if data["return_date"]:
-            checkout.return_date = datetime.fromisoformat(data["return_date"])
+            checkout.return_date = _to_datetime(data["return_date"])
         return checkout
 
     def __str__(self) -> str:
@@ -93,6 +110,8 @@ class CheckoutManager:
         book_manager (BookManager): An instance of the BookManager to manage book-related operations.
         user_manager (UserManager): An instance of the UserManager to manage user-related operations.
         checkouts (List[Checkout]): A list of all current checkouts in the system.
+        _open (Dict[Tuple[str, str], int]): Positions in checkouts of the active checkouts,
+            keyed by (user_id, item_id).
     """
 
     def __init__(self, book_manager: BookManager, user_manager: UserManager):
@@ -104,7 +123,12 @@ class CheckoutManager:
             user_manager (UserManager): The manager responsible for user operations.
         """
         self.storage = CheckoutStorage()
-        self.checkouts = [Checkout.from_dict(checkout) for checkout in self.storage.load_checkouts()]
+        self.checkouts: List[Checkout] = []
+        self._open: Dict[Tuple[str, str], int] = {}
+        for data in self.storage.load_checkouts():
+            if not data["return_date"]:
+                self._open[(data["user_id"], data["item_id"])] = len(self.checkouts)
+            self.checkouts.append(Checkout.from_dict(data))
         self.book_manager = book_manager
         self.user_manager = user_manager
 
@@ -130,13 +154,15 @@ class CheckoutManager:
             raise ValueError(f"Book with ISBN {isbn} is not available")
 
         checkout = Checkout(user_id, isbn)
+        self._open[(user_id, isbn)] = len(self.checkouts)
         self.checkouts.append(checkout)
         book.is_available = False
         user.borrow_item(isbn)
 
-        self._save_checkouts()
-        self.book_manager._save_books()
-        self.user_manager._save_users()
+        with self._transaction():
+            self._log_checkout("add", len(self.checkouts) - 1)
+            self.book_manager._log_book("upd", book)
+            self.user_manager._mark_dirty("upd", user)
 
     def return_book(self, user_id: str, isbn: str) -> None:
         """
@@ -157,17 +183,18 @@ class CheckoutManager:
         if not book:
             raise ValueError(f"Book with ISBN {isbn} not found")
 
-        checkout = next((c for c in self.checkouts if c.user_id == user_id and c.item_id == isbn and not c.return_date), None)
-        if not checkout:
+        index = self._open.pop((user_id, isbn), None)
+        if index is None:
             raise ValueError(f"No active checkout found for user {user_id} and book {isbn}")
 
-        checkout.return_item()
+        self.checkouts[index].return_item()
         book.is_available = True
         user.return_item(isbn)
 
-        self._save_checkouts()
-        self.book_manager._save_books()
-        self.user_manager._save_users()
+        with self._transaction():
+            self._log_checkout("upd", index)
+            self.book_manager._log_book("upd", book)
+            self.user_manager._mark_dirty("upd", user)
 
     def list_checkouts(self) -> List[Checkout]:
         """
@@ -178,6 +205,28 @@ class CheckoutManager:
         """
         return self.checkouts
 
+    @contextmanager
+    def _transaction(self):
+        """
+        Defer the storage writes of the checkout, book and user stores to a single write per file on exit.
+        """
+        with self.storage.transaction(), \
+                self.book_manager.storage.transaction(), \
+                self.user_manager.storage.transaction():
+            yield
+
+    def _log_checkout(self, op: str, index: int) -> None:
+        """
+        Record a change to a single checkout in storage, saving all checkouts once the change log grows too large.
+
+        Args:
+            op (str): The kind of change: "add" or "upd".
+            index (int): The position of the changed checkout in checkouts.
+        """
+        self.storage.append_record(op, index, self.checkouts[index].to_dict())
+        if self.storage.needs_compaction():
+            self._save_checkouts()
+
     def _save_checkouts(self):
         """
         Save the current list of checkouts to persistent storage.
@@ -1,14 +1,23 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 from book import BookManager
 from user import UserManager
 from check import CheckoutManager
 
-# Configure logging for the Library Management System
-logging.basicConfig(
-    filename='library.log', 
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Configure logging for the Library Management System. Records are queued and
+# written to library.log by a background listener thread, so menu actions do
+# not wait on the log file.
+_log_queue = queue.Queue()
+_log_file_handler = logging.FileHandler('library.log')
+_log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_file_handler)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(_log_queue))
+logging.getLogger().setLevel(logging.INFO)
+_log_listener.start()
+# Flush queued records before the interpreter exits
+atexit.register(_log_listener.stop)
 
 class LibraryManagementSystem:
     """
@@ -31,6 +40,23 @@ class LibraryManagementSystem:
         self.book_manager = BookManager()
         self.user_manager = UserManager()
         self.checkout_manager = CheckoutManager(self.book_manager, self.user_manager)
+        self._running = True
+        # Menu choices mapped to the methods handling them
+        self._actions = {
+            '1': self.add_book,
+            '2': self.list_books,
+            '3': self.update_book,
+            '4': self.delete_book,
+            '5': self.search_books,
+            '6': self.add_user,
+            '7': self.update_user,
+            '8': self.list_users,
+            '9': self.search_users,
+            '10': self.delete_user,
+            '11': self.checkout_book,
+            '12': self.return_book,
+            '13': self.exit_system,
+        }
     
     def run(self):
         """
@@ -39,7 +65,7 @@ class LibraryManagementSystem:
         Continuously displays the main menu and processes the user's menu choice
         until the user chooses to exit.
         """
-        while True:
+        while self._running:
             self.display_menu()
             choice = input("Enter your choice: ")
             self.process_choice(choice)
@@ -76,41 +102,26 @@ class LibraryManagementSystem:
         Depending on the choice, it calls the corresponding method to perform 
         the desired operation (e.g., add a book, list users, checkout a book).
         """
+        handler = self._actions.get(choice)
+        if handler is None:
+            print("Invalid choice. Please try again.")
+            return
         try:
-            if choice == '1':
-                self.add_book()
-            elif choice == '2':
-                self.list_books()
-            elif choice == '3':
-                self.update_book()
-            elif choice == '4':
-                self.delete_book()
-            elif choice == '5':
-                self.search_books()
-            elif choice == '6':
-                self.add_user()
-            elif choice == '7':
-                self.update_user()
-            elif choice == '8':
-                self.list_users()
-            elif choice == '9':
-                self.search_users()
-            elif choice == '10':
-                self.delete_user()
-            elif choice == '11':
-                self.checkout_book()
-            elif choice == '12':
-                self.return_book()
-            elif choice == '13':
-                print("Thank you for using the Library Management System. Goodbye!")
-                exit()
-            else:
-                print("Invalid choice. Please try again.")
+            handler()
         except Exception as e:
             # Log any errors that occur during menu processing
             print(f"An error occurred: {str(e)}")
             logging.error(f"Error in process_choice: {str(e)}")
                        
+    def exit_system(self):
+        """
+        Exit the Library Management System.
+
+        Says goodbye and stops the main loop after the current choice has been processed.
+        """
+        print("Thank you for using the Library Management System. Goodbye!")
+        self._running = False
+
     def add_book(self):
         """
         Add a new book to the library.
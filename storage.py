@@ -1,13 +1,68 @@
-import json
-from typing import List, Dict, Any
+import orjson
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Optional
 import os
 
+# The change log is only folded back into the JSON snapshot once it holds more
+# entries than the snapshot holds records (and at least this many).
+COMPACT_MIN_ENTRIES = 64
+
+# Buffer size used when streaming records into a JSON file
+WRITE_BUFFER_SIZE = 64 * 1024
+
+def _to_dict_default(obj: Any) -> Any:
+    """
+    Encode objects orjson does not know natively, such as Book, through their to_dict method.
+
+    Args:
+        obj (Any): The object to encode.
+
+    Returns:
+        Any: The dictionary representation of the object.
+
+    Raises:
+        TypeError: If the object has no to_dict method.
+    """
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+    return to_dict()
+
+@lru_cache(maxsize=32)
+def _load_path(path: str, ino: int, mtime_ns: int, ctime_ns: int, size: int) -> Any:
+    """
+    Parse a JSON file, caching the result on the file's identity, timestamps and size.
+
+    The cache key changes whenever the file is rewritten: every save replaces the file
+    with a new one, so the inode number changes even when the timestamps are too coarse
+    to. Repeated loads of an unchanged file skip the parse. The returned data is shared
+    and must not be modified.
+
+    Args:
+        path (str): The absolute path of the JSON file.
+        ino (int): The inode number of the file.
+        mtime_ns (int): The modification time of the file in nanoseconds.
+        ctime_ns (int): The status change time of the file in nanoseconds.
+        size (int): The size of the file in bytes.
+
+    Returns:
+        Any: The parsed JSON data.
+    """
+    with open(path, 'rb') as file:
+        return orjson.loads(file.read())
+
 class Storage:
     """
     A base class for handling the storage of data to and from a JSON file.
 
+    The JSON file holds a snapshot of the collection. Individual changes made
+    after the snapshot was written are appended to a JSONL change log next to
+    it and replayed on load, so a single mutation does not rewrite the whole file.
+
     Attributes:
         file_path (str): The path to the JSON file used for storage.
+        log_path (str): The path to the JSONL change log for the JSON file.
     """
 
     def __init__(self, file_path: str):
@@ -18,17 +73,175 @@ class Storage:
             file_path (str): The file path where data will be saved and loaded.
         """
         self.file_path = file_path
+        self.log_path = os.path.splitext(file_path)[0] + '.jsonl'
+        self._log_entries = 0
+        self._snapshot_records = 0
+        self._pending: Optional[List[bytes]] = None
+        self._depth = 0
+
+    def begin(self):
+        """
+        Start deferring change log writes until the matching commit.
+
+        Calls may be nested; only the outermost commit writes to the file.
+        """
+        if self._depth == 0:
+            self._pending = []
+        self._depth += 1
+
+    def commit(self):
+        """
+        End a deferred block, writing the collected change log entries at once if it is the outermost one.
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            pending, self._pending = self._pending, None
+            if pending:
+                with open(self.log_path, 'ab') as file:
+                    file.write(b"".join(pending))
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager deferring change log writes to a single write on exit.
+        """
+        self.begin()
+        try:
+            yield
+        finally:
+            self.commit()
+
+    def save_data(self, data: Dict[str, List[Any]]):
+        """
+        Save data to the JSON file and discard the change log it supersedes.
+
+        Args:
+            data (Dict[str, List[Any]]): The data to save in the format of a dictionary
+            containing lists of records. Records may be dictionaries or objects with a
+            to_dict method, which are converted while encoding.
+        """
+        # orjson encodes the records in C and writes compact bytes
+        self._write_file([orjson.dumps(data, default=_to_dict_default)])
+        self._snapshot_records = sum(len(records) for records in data.values())
 
-    def save_data(self, data: Dict[str, List[Dict[str, Any]]]):
+    def save_encoded(self, name: str, records: Iterable[bytes]):
         """
-        Save data to the JSON file.
+        Save a collection whose records are already encoded as JSON.
+
+        Records are written out one at a time as the iterable produces them, so the
+        encoded collection is never assembled in memory as a whole.
+
+        Args:
+            name (str): The name of the collection in the JSON file (e.g., "users").
+            records (Iterable[bytes]): The JSON encoding of each record.
+        """
+        count = 0
+
+        def chunks():
+            nonlocal count
+            yield b"{" + orjson.dumps(name) + b":["
+            for record in records:
+                if count:
+                    yield b","
+                yield record
+                count += 1
+            yield b"]}"
+
+        self._write_file(chunks())
+        self._snapshot_records = count
+
+    def _write_file(self, chunks: Iterable[bytes]):
+        """
+        Replace the JSON file with the given content and discard the change log it supersedes.
 
         Args:
-            data (Dict[str, List[Dict[str, Any]]]): The data to save in the format
-            of a dictionary containing lists of dictionaries.
+            chunks (Iterable[bytes]): The encoded JSON data, in consecutive pieces.
+        """
+        # Write to a temporary file and rename it over the JSON file, so an
+        # interrupted save never leaves a partially written file behind
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as file:
+            file.writelines(chunks)
+        os.replace(tmp_path, self.file_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        if self._pending:
+            # Deferred entries are already part of the saved data
+            self._pending.clear()
+        self._log_entries = 0
+
+    def dump_pretty(self, name: str, key_field: Optional[str] = None) -> str:
         """
-            with open(self.file_path, 'w') as file:
-                json.dump(data, file, indent=2, default=str)
+        Return the current state of a collection as indented JSON, for inspecting it by hand.
+
+        The JSON file itself is written compactly. The change log is replayed over it as on
+        load, so changes not yet compacted into the file are included.
+
+        Args:
+            name (str): The name of the collection in the JSON file (e.g., "books").
+            key_field (Optional[str]): The record field that keys the change log entries, as
+            for load_collection.
+
+        Returns:
+            str: The indented JSON text.
+        """
+        data = {name: self.load_collection(name, key_field)}
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
+    def append_record(self, op: str, key: Any, record: Optional[Any] = None):
+        """
+        Append a single change to the JSONL change log.
+
+        Args:
+            op (str): The kind of change: "add", "upd" or "del".
+            key (Any): The key of the changed record.
+            record (Optional[Any]): The full record for "add" and "upd" changes, as a dictionary
+            or an object with a to_dict method.
+        """
+        entry = {"op": op, "key": key}
+        if record is not None:
+            entry["rec"] = record
+        self._append_line(orjson.dumps(entry, default=_to_dict_default) + b"\n")
+
+    def append_encoded(self, op: str, key: Any, record: bytes):
+        """
+        Append a single change whose record is already encoded as JSON to the change log.
+
+        Args:
+            op (str): The kind of change: "add" or "upd".
+            key (Any): The key of the changed record.
+            record (bytes): The JSON encoding of the full record.
+        """
+        self._append_line(b'{"op":' + orjson.dumps(op) + b',"key":' + orjson.dumps(key) + b',"rec":' + record + b"}\n")
+
+    def _append_line(self, line: bytes):
+        """
+        Append one encoded entry to the change log, or hold it back inside a transaction.
+
+        Args:
+            line (bytes): The encoded entry, including its trailing newline.
+        """
+        if self._pending is not None:
+            self._pending.append(line)
+        else:
+            with open(self.log_path, 'ab') as file:
+                file.write(line)
+        self._log_entries += 1
+
+    def needs_compaction(self) -> bool:
+        """
+        Check whether the change log has grown large enough to be folded into the JSON file.
+
+        The log is compared with the number of records in the last snapshot written or
+        loaded rather than with the live records, so a collection whose records are each
+        changed only a few times (such as checkouts) is still compacted. A full save only
+        happens once the log has outgrown the snapshot, so its cost stays proportional
+        to the number of changes logged.
+
+        Returns:
+            bool: True if the collection should be saved in full.
+        """
+        return self._log_entries > max(self._snapshot_records, COMPACT_MIN_ENTRIES)
 
     def load_data(self) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -37,13 +250,56 @@ class Storage:
         Returns:
             Dict[str, List[Dict[str, Any]]]: The loaded data in the form of a dictionary.
             Returns default empty lists for "books", "users", and "checkouts" if the file does not exist.
+            The returned data may be shared with other loads of the same file and must not be modified.
         """
         if not os.path.exists(self.file_path):
             # If the file doesn't exist, return an empty data structure
             return {"books": [], "users": [], "checkouts": []}
-        with open(self.file_path, 'r') as file:
-            # Load and return the data from the JSON file
-            return json.load(file)
+        # Load and return the data from the JSON file, reusing the last parse if it is unchanged
+        stat = os.stat(self.file_path)
+        return _load_path(
+            os.path.abspath(self.file_path), stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size
+        )
+
+    def load_collection(self, name: str, key_field: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Load a collection from the JSON file and replay the change log on top of it.
+
+        Args:
+            name (str): The name of the collection in the JSON file (e.g., "books").
+            key_field (Optional[str]): The record field that keys the change log entries.
+            Records are keyed by their position in the collection if not given.
+
+        Returns:
+            List[Dict[str, Any]]: The current records of the collection.
+        """
+        records = self.load_data().get(name, [])
+        if key_field:
+            live = {record[key_field]: record for record in records}
+        else:
+            live = dict(enumerate(records))
+        self._snapshot_records = len(records)
+        self._log_entries = 0
+        if os.path.exists(self.log_path):
+            complete = 0
+            torn = False
+            with open(self.log_path, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        # Incomplete trailing entry left by an interrupted write
+                        torn = True
+                        break
+                    entry = orjson.loads(line)
+                    if entry["op"] == "del":
+                        live.pop(entry["key"], None)
+                    else:
+                        live[entry["key"]] = entry["rec"]
+                    self._log_entries += 1
+                    complete += len(line)
+            if torn:
+                # Cut the fragment off, so the next entry is not appended onto it
+                os.truncate(self.log_path, complete)
+        return list(live.values())
 
 class BookStorage(Storage):
     """
@@ -57,23 +313,23 @@ class BookStorage(Storage):
         """
         super().__init__('books.json')
 
-    def save_books(self, books: List[Dict[str, Any]]):
+    def save_books(self, books: List[Any]):
         """
         Save the list of books to the JSON file.
 
         Args:
-            books (List[Dict[str, Any]]): A list of dictionaries containing book information.
+            books (List[Any]): A list of Book objects or dictionaries containing book information.
         """
         self.save_data({"books": books})
 
     def load_books(self) -> List[Dict[str, Any]]:
         """
-        Load the list of books from the JSON file.
+        Load the list of books from the JSON file and its change log.
 
         Returns:
             List[Dict[str, Any]]: A list of dictionaries containing book information.
         """
-        return self.load_data().get("books", [])
+        return self.load_collection("books", "isbn")
 
 class UserStorage(Storage):
     """
@@ -96,14 +352,23 @@ class UserStorage(Storage):
         """
         self.save_data({"users": users})
 
+    def save_encoded_users(self, users: Iterable[bytes]):
+        """
+        Save the users, already encoded as JSON, to the JSON file.
+
+        Args:
+            users (Iterable[bytes]): The JSON encoding of each user.
+        """
+        self.save_encoded("users", users)
+
     def load_users(self) -> List[Dict[str, Any]]:
         """
-        Load the list of users from the JSON file.
+        Load the list of users from the JSON file and its change log.
 
         Returns:
             List[Dict[str, Any]]: A list of dictionaries containing user information.
         """
-        return self.load_data().get("users", [])
+        return self.load_collection("users", "user_id")
 
 class CheckoutStorage(Storage):
     """
@@ -128,9 +393,9 @@ class CheckoutStorage(Storage):
 
     def load_checkouts(self) -> List[Dict[str, Any]]:
         """
-        Load the list of checkouts from the JSON file.
+        Load the list of checkouts from the JSON file and its change log.
 
         Returns:
             List[Dict[str, Any]]: A list of dictionaries containing checkout information.
         """
-        return self.load_data().get("checkouts", [])
+        return self.load_collection("checkouts")
@@ -0,0 +1,56 @@
+import os
+import random
+import tempfile
+import unittest
+
+from book import BookManager
+
+
+class BookManagerSearchTest(unittest.TestCase):
+    """
+    Tests for BookManager.search_books.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_nul_query_does_not_match_across_fields(self):
+        manager = BookManager()
+        manager.add_book("a", "b", "1")
+
+        self.assertEqual(manager.search_books("a\0b"), [])
+        self.assertEqual(len(manager.search_books("a")), 1)
+
+    def test_search_matches_per_field_filter(self):
+        rng = random.Random(11)
+
+        def text(length):
+            return "".join(rng.choice("abAB1\0") for _ in range(rng.randint(0, length)))
+
+        manager = BookManager()
+        for step in range(300):
+            isbns = [book.item_id for book in manager.list_books()]
+            choice = rng.random()
+            if choice < 0.5 or not isbns:
+                manager.add_book(text(6), text(6), text(3) + str(step))
+            elif choice < 0.8:
+                manager.update_book(rng.choice(isbns), text(6) or None, text(6) or None)
+            else:
+                manager.delete_book(rng.choice(isbns))
+            for _ in range(3):
+                query = text(4)
+                expected = [
+                    book for book in manager.list_books()
+                    if query.lower() in book.title.lower()
+                    or query.lower() in book.author.lower()
+                    or query.lower() in book.item_id.lower()
+                ]
+                self.assertEqual(manager.search_books(query), expected, repr(query))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from catalog import PackedCatalog
+
+
+class PackedCatalogTest(unittest.TestCase):
+    """
+    Tests for substring search over a packed catalog.
+    """
+
+    def setUp(self):
+        self.catalog = PackedCatalog(["anna\0a1", "bob\0b2", "hannah\0h3"], lambda text: text)
+
+    def test_find_returns_each_match_once_in_order(self):
+        self.assertEqual(self.catalog.find("an"), ["anna\0a1", "hannah\0h3"])
+
+    def test_find_matches_the_last_item(self):
+        self.assertEqual(self.catalog.find("h3"), ["hannah\0h3"])
+
+    def test_find_does_not_match_across_items(self):
+        self.assertEqual(self.catalog.find("1b"), [])
+
+    def test_empty_catalog(self):
+        self.assertEqual(PackedCatalog([], lambda text: text).find("a"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+import orjson
+
+from book import BookManager
+from check import CheckoutManager
+from user import UserManager
+from storage import COMPACT_MIN_ENTRIES, Storage
+
+
+class StorageLogTest(unittest.TestCase):
+    """
+    Tests for the JSONL change log kept next to each JSON snapshot.
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, "items.json")
+
+    def _storage(self) -> Storage:
+        return Storage(self.path)
+
+    def test_replay_applies_log_over_snapshot(self):
+        storage = self._storage()
+        storage.save_data({"items": [{"id": "a", "v": 1}, {"id": "b", "v": 1}]})
+        storage.append_record("upd", "a", {"id": "a", "v": 2})
+        storage.append_record("del", "b")
+        storage.append_encoded("add", "c", b'{"id":"c","v":3}')
+
+        records = self._storage().load_collection("items", "id")
+
+        self.assertEqual(records, [{"id": "a", "v": 2}, {"id": "c", "v": 3}])
+
+    def test_torn_tail_is_skipped_and_cut_off(self):
+        storage = self._storage()
+        storage.append_record("add", "a", {"id": "a"})
+        with open(storage.log_path, "ab") as file:
+            file.write(b'{"op":"add","key":"b","rec":{"i')
+
+        storage = self._storage()
+        self.assertEqual(storage.load_collection("items", "id"), [{"id": "a"}])
+        storage.append_record("add", "c", {"id": "c"})
+
+        self.assertEqual(self._storage().load_collection("items", "id"), [{"id": "a"}, {"id": "c"}])
+
+    def test_torn_tail_survives_manager_restart(self):
+        cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        BookManager().add_book("First", "Author", "1")
+        with open("books.jsonl", "ab") as file:
+            file.write(b'{"op":"add","key":"2","rec":{"ti')
+        BookManager().add_book("Third", "Author", "3")
+
+        books = BookManager().list_books()
+
+        self.assertEqual([book.item_id for book in books], ["1", "3"])
+
+    def test_rewrite_with_same_size_and_mtime_is_reloaded(self):
+        storage = self._storage()
+        storage.save_data({"items": [{"id": "a", "name": "Ann"}]})
+        first = os.stat(self.path)
+        self.assertEqual(storage.load_data()["items"][0]["name"], "Ann")
+
+        storage.save_data({"items": [{"id": "a", "name": "Bob"}]})
+        # Simulate a filesystem whose timestamps did not advance between the saves
+        os.utime(self.path, ns=(first.st_atime_ns, first.st_mtime_ns))
+
+        self.assertEqual(self._storage().load_data()["items"][0]["name"], "Bob")
+
+    def test_dump_pretty_includes_logged_changes(self):
+        storage = self._storage()
+        storage.save_data({"items": [{"id": "a", "v": 1}]})
+        storage.append_record("upd", "a", {"id": "a", "v": 2})
+
+        dumped = storage.dump_pretty("items", "id")
+
+        self.assertEqual(orjson.loads(dumped), {"items": [{"id": "a", "v": 2}]})
+        self.assertIn("\n  ", dumped)
+
+    def test_compaction_folds_log_into_snapshot(self):
+        storage = self._storage()
+        for index in range(COMPACT_MIN_ENTRIES + 1):
+            storage.append_record("upd", "a", {"id": "a", "v": index})
+        self.assertTrue(storage.needs_compaction())
+
+        storage.save_data({"items": storage.load_collection("items", "id")})
+
+        self.assertFalse(os.path.exists(storage.log_path))
+        self.assertFalse(storage.needs_compaction())
+        self.assertEqual(
+            self._storage().load_collection("items", "id"),
+            [{"id": "a", "v": COMPACT_MIN_ENTRIES}],
+        )
+
+
+    def test_checkout_log_is_compacted(self):
+        cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        books = BookManager()
+        users = UserManager()
+        books.add_book("Title", "Author", "1")
+        users.add_user("Name", "u1")
+        checkouts = CheckoutManager(books, users)
+        cycles = 200
+        for _ in range(cycles):
+            checkouts.checkout_book("u1", "1")
+            checkouts.return_book("u1", "1")
+
+        with open("checkouts.jsonl", "rb") as file:
+            log_lines = sum(1 for _ in file)
+        # Each cycle logs two entries; the log must have been folded into the snapshot
+        self.assertLess(log_lines, cycles)
+        self.assertTrue(os.path.exists("checkouts.json"))
+        reloaded = CheckoutManager(BookManager(), UserManager()).list_checkouts()
+        self.assertEqual(len(reloaded), cycles)
+        self.assertTrue(all(checkout.return_date for checkout in reloaded))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import random
+import tempfile
+import unittest
+
+from user import UserManager
+
+
+class UserManagerTest(unittest.TestCase):
+    """
+    Tests for UserManager search, buffered writes and bulk operations.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    @staticmethod
+    def _ids(users):
+        return [user.user_id for user in users]
+
+    def _assert_search_matches_filter(self, manager: UserManager, query: str):
+        expected = [
+            user for user in manager.list_users()
+            if query.lower() in user.name.lower() or query.lower() in user.user_id.lower()
+        ]
+        self.assertEqual(self._ids(manager.search_users(query)), self._ids(expected), repr(query))
+
+    def test_search_matches_plain_filter(self):
+        rng = random.Random(7)
+
+        def text(length):
+            return "".join(rng.choice("abcAB1\0") for _ in range(rng.randint(0, length)))
+
+        manager = UserManager()
+        ids = []
+        for step in range(600):
+            if step == 300:
+                # Continue on a reloaded manager, whose trigram index is not built yet
+                manager = UserManager()
+            choice = rng.random()
+            if choice < 0.5 or not ids:
+                user_id = text(4) + str(step)
+                manager.add_user(text(8), user_id)
+                ids.append(user_id)
+            elif choice < 0.8:
+                manager.update_user(rng.choice(ids), text(8))
+            else:
+                user_id = rng.choice(ids)
+                ids.remove(user_id)
+                manager.delete_user(user_id)
+            for _ in range(3):
+                self._assert_search_matches_filter(manager, text(5))
+
+    def test_search_before_and_after_index_build(self):
+        manager = UserManager()
+        manager.add_users([("Alice", "u1"), ("Bob", "u2"), ("Alina", "u3")])
+        manager = UserManager()
+        manager.update_user("u2", "Alibaba")
+        manager.delete_user("u3")
+        self.assertIsNone(manager._trigram_index)
+
+        self.assertEqual(self._ids(manager.search_users("ali")), ["u1", "u2"])
+        self.assertIsNotNone(manager._trigram_index)
+
+        manager.update_user("u1", "Zed")
+        manager.add_user("Alistair", "u4")
+        self.assertEqual(self._ids(manager.search_users("ali")), ["u2", "u4"])
+        self.assertEqual(self._ids(manager.search_users("al")), ["u2", "u4"])
+
+    def test_change_drops_cached_search_results(self):
+        manager = UserManager()
+        manager.add_user("Alice", "u1")
+        manager.search_users("")
+        manager.search_users("ali")
+
+        manager.add_user("Bob", "u2")
+
+        self.assertEqual(manager._cached_search.cache_info().currsize, 0)
+        self.assertEqual(self._ids(manager.search_users("")), ["u1", "u2"])
+
+    def test_delete_after_direct_rename(self):
+        manager = UserManager()
+        manager.add_user("Alice", "u1")
+        manager.search_users("alice")
+        manager.get_user_by_id("u1").name = "Zelda"
+
+        manager.delete_user("u1")
+
+        self.assertEqual(manager.search_users("alice"), [])
+        self.assertEqual(UserManager().list_users(), [])
+
+    def test_buffered_delete_and_readd_keeps_order_after_reload(self):
+        manager = UserManager()
+        manager.add_users([("A", "a"), ("B", "b"), ("C", "c")])
+        with manager.buffered():
+            manager.delete_user("a")
+            manager.add_user("A again", "a")
+        self.assertEqual(self._ids(manager.list_users()), ["b", "c", "a"])
+
+        reloaded = UserManager()
+
+        self.assertEqual(self._ids(reloaded.list_users()), ["b", "c", "a"])
+        self.assertEqual(self._ids(reloaded.search_users("")), ["b", "c", "a"])
+        self.assertEqual(reloaded.get_user_by_id("a").name, "A again")
+
+    def test_buffered_changes_are_coalesced(self):
+        manager = UserManager()
+        manager.add_user("Name", "u1")
+        with manager.buffered():
+            for index in range(5):
+                manager.update_user("u1", f"Name {index}")
+            with open("users.jsonl", "rb") as file:
+                self.assertEqual(len(file.readlines()), 1)
+
+        with open("users.jsonl", "rb") as file:
+            self.assertEqual(len(file.readlines()), 2)
+        self.assertEqual(UserManager().get_user_by_id("u1").name, "Name 4")
+
+    def test_add_users_is_all_or_nothing(self):
+        manager = UserManager()
+        manager.add_user("Existing", "u1")
+
+        with self.assertRaises(ValueError):
+            manager.add_users([("New", "u2"), ("Again", "u1")])
+        with self.assertRaises(ValueError):
+            manager.add_users([("New", "u3"), ("Twice", "u3")])
+
+        self.assertEqual(self._ids(manager.list_users()), ["u1"])
+        self.assertEqual(self._ids(UserManager().list_users()), ["u1"])
+
+    def test_delete_users_is_all_or_nothing(self):
+        manager = UserManager()
+        manager.add_users([("A", "a"), ("B", "b")])
+
+        with self.assertRaises(ValueError):
+            manager.delete_users(["a", "missing"])
+        self.assertEqual(self._ids(manager.list_users()), ["a", "b"])
+
+        manager.delete_users(["a", "b", "a"])
+        self.assertEqual(UserManager().list_users(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,25 @@
-from typing import List, Optional
+import orjson
+import sys
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from catalog import PackedCatalog
 from storage import UserStorage
 
 
+def _trigrams(text: str) -> Set[str]:
+    """
+    Return the set of three-character substrings of a string.
+
+    Args:
+        text (str): The string to split.
+
+    Returns:
+        Set[str]: Every run of three consecutive characters in the string.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
 class User:
     """
     Represents a user in the system.
@@ -9,9 +27,25 @@ class User:
     Attributes:
         name (str): The name of the user.
         user_id (str): A unique identifier for the user.
-        borrowed_items (List[str]): A list of item IDs borrowed by the user.
+        borrowed_items (Dict[str, None]): The IDs of the items borrowed by the user, kept as
+            dictionary keys for constant-time membership checks in borrowing order.
+        _cached_dict (Optional[dict]): The storage dictionary of the user, built on demand
+            and cleared whenever the user changes.
+        _cached_json (Optional[bytes]): The JSON encoding of the storage dictionary, cached
+            the same way.
+        _cached_str (Optional[str]): The string representation of the user, cached the same way.
+        _cached_items (Optional[Tuple[str, ...]]): The borrowed item IDs returned by
+            get_borrowed_items, cached the same way.
+        _name_lower (str): The lower-cased name, matched by UserManager.search_users.
+        _id_lower (str): The lower-cased user_id, matched by UserManager.search_users.
     """
 
+    __slots__ = (
+        "_name", "user_id", "borrowed_items",
+        "_cached_dict", "_cached_json", "_cached_str", "_cached_items",
+        "_name_lower", "_id_lower",
+    )
+
     def __init__(self, name: str, user_id: str):
         """
         Initialize a new User.
@@ -20,51 +54,107 @@ class User:
             name (str): The name of the user.
             user_id (str): A unique identifier for the user.
         """
+        # Interned so lookups keyed by the ID and borrowed item references share one string
+        self.user_id = sys.intern(user_id)
         self.name = name
-        self.user_id = user_id
-        self.borrowed_items: List[str] = []
+        self.borrowed_items: Dict[str, None] = {}
+
+    @property
+    def name(self) -> str:
+        """
+        str: The name of the user. Setting it refreshes the search fields and clears the
+        cached storage representation. Rename managed users through
+        UserManager.update_user, which also updates the search index and storage.
+        """
+        return self._name
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self._name = value
+        self._refresh_search_fields()
+        self._invalidate()
+
+    def _refresh_search_fields(self) -> None:
+        """
+        Recompute the lower-cased name and user_id.
+        """
+        self._name_lower = self._name.lower()
+        self._id_lower = self.user_id.lower()
+
+    def _invalidate(self) -> None:
+        """
+        Clear the cached storage and string representations after the user has changed.
+        """
+        self._cached_dict = None
+        self._cached_json = None
+        self._cached_str = None
+        self._cached_items = None
 
     def borrow_item(self, item_id: str) -> None:
         """
-        Add an item to the user's borrowed items list.
+        Add an item to the user's borrowed items.
 
         Args:
             item_id (str): The ID of the item being borrowed.
         """
-        if item_id not in self.borrowed_items:
-            self.borrowed_items.append(item_id)
+        self.borrowed_items[sys.intern(item_id)] = None
+        self._invalidate()
 
     def return_item(self, item_id: str) -> None:
         """
-        Remove an item from the user's borrowed items list.
+        Remove an item from the user's borrowed items.
 
         Args:
             item_id (str): The ID of the item being returned.
         """
-        if item_id in self.borrowed_items:
-            self.borrowed_items.remove(item_id)
+        self.borrowed_items.pop(item_id, None)
+        self._invalidate()
 
-    def get_borrowed_items(self) -> List[str]:
+    def get_borrowed_items(self) -> Tuple[str, ...]:
         """
-        Retrieve the list of borrowed item IDs.
+        Retrieve the borrowed item IDs.
+
+        The returned tuple is immutable, so it can be kept or passed on without
+        copying, and is reused until the user borrows or returns an item.
 
         Returns:
-            List[str]: A list of borrowed item IDs.
+            Tuple[str, ...]: The borrowed item IDs, in borrowing order.
         """
-        return self.borrowed_items
+        if self._cached_items is None:
+            self._cached_items = tuple(self.borrowed_items)
+        return self._cached_items
 
     def to_dict(self) -> dict:
         """
         Convert the User object to a dictionary for storage.
 
+        The dictionary is cached until the user changes, so saving unchanged users
+        does not rebuild it. It must not be modified by the caller.
+
         Returns:
             dict: The dictionary representation of the User.
         """
-        return {
-            "name": self.name,
-            "user_id": self.user_id,
-            "borrowed_items": self.borrowed_items
-        }
+        if self._cached_dict is None:
+            self._cached_dict = {
+                "name": self.name,
+                "user_id": self.user_id,
+                "borrowed_items": list(self.borrowed_items)
+            }
+        return self._cached_dict
+
+    def to_json(self) -> bytes:
+        """
+        Encode the User object as JSON for storage.
+
+        The encoding is cached until the user changes, so saving unchanged users
+        does not encode them again.
+
+        Returns:
+            bytes: The JSON encoding of the dictionary representation of the User.
+        """
+        if self._cached_json is None:
+            self._cached_json = orjson.dumps(self.to_dict())
+        return self._cached_json
 
     @classmethod
     def from_dict(cls, data: dict) -> 'User':
@@ -78,34 +168,124 @@ class User:
             User: The created User object.
         """
         user = cls(data["name"], data["user_id"])
-        user.borrowed_items = data["borrowed_items"]
+        user.borrowed_items = dict.fromkeys(map(sys.intern, data["borrowed_items"]))
+        user._invalidate()
+        return user
+
+    @classmethod
+    def _from_dict_fast(cls, data: dict) -> 'User':
+        """
+        Create a User object from a stored dictionary without running __init__.
+
+        Used when loading users in bulk: every slot is assigned once, instead of
+        building an empty user and then replacing its borrowed items.
+
+        Args:
+            data (dict): A dictionary containing user information.
+
+        Returns:
+            User: The created User object.
+        """
+        user = object.__new__(cls)
+        user._name = data["name"]
+        user.user_id = sys.intern(data["user_id"])
+        user.borrowed_items = dict.fromkeys(map(sys.intern, data["borrowed_items"]))
+        user._cached_dict = None
+        user._cached_json = None
+        user._cached_str = None
+        user._cached_items = None
+        user._refresh_search_fields()
         return user
 
     def __str__(self) -> str:
         """
         Return a string representation of the User.
 
+        The string is cached until the user changes.
+
         Returns:
             str: A string representation of the User object.
         """
-        return f"User(name='{self.name}', user_id='{self.user_id}', borrowed_items={self.borrowed_items})"
+        if self._cached_str is None:
+            self._cached_str = f"User(name='{self.name}', user_id='{self.user_id}', borrowed_items={list(self.borrowed_items)})"
+        return self._cached_str
 
 
 class UserManager:
     """
     Manages a collection of User objects, including adding, updating, and removing users.
 
+    The users are only loaded from storage the first time the users property is read,
+    so creating a UserManager is cheap when no user operation follows. The trigram
+    index, which dominates the cost of loading, is in turn only built by the first
+    search that uses it.
+
     Attributes:
         storage (UserStorage): The storage handler for user data.
-        users (List[User]): A list of User objects managed by the UserManager.
+        _users (Optional[Dict[str, User]]): The User objects managed by the UserManager, keyed
+            by user_id in insertion order, or None until they are loaded.
+        _dirty (Dict[str, str]): Changes not yet written to storage, as the kind of
+            change ("add", "upd", "del", or "readd" for a user deleted and added again)
+            keyed by user_id, in the order they are to be written.
+        _search_keys (Dict[str, Tuple[int, str, str]]): The insertion sequence number and the
+            lower-cased name and user_id each user was indexed with, keyed by user_id. Search
+            and unindexing go by these rather than the fields on the User, so a user renamed
+            without the manager cannot corrupt the index.
+        _trigram_index (Optional[Dict[str, Set[str]]]): The IDs of the users whose lower-cased
+            name or user_id contains each trigram, or None until it is first needed.
+        _catalog (Optional[PackedCatalog[User]]): Packed lower-cased names and user_ids of all
+            users for scanning short queries, or None until the next such search after the
+            users change.
+        _gen (int): Generation counter bumped on every change that can affect search results,
+            so cached results of earlier generations are never returned.
     """
 
     def __init__(self):
         """
-        Initialize the UserManager and load existing users from storage.
+        Initialize the UserManager. Existing users are loaded from storage when first needed.
         """
         self.storage = UserStorage()
-        self.users = [User.from_dict(user) for user in self.storage.load_users()]
+        self._users: Optional[Dict[str, User]] = None
+        self._search_keys: Dict[str, Tuple[int, str, str]] = {}
+        self._next_seq = 0
+        self._trigram_index: Optional[Dict[str, Set[str]]] = None
+        self._dirty: Dict[str, str] = {}
+        self._buffer_depth = 0
+        self._gen = 0
+        self._catalog: Optional[PackedCatalog[User]] = None
+        self._cached_search = lru_cache(maxsize=512)(self._search)
+
+    @property
+    def users(self) -> Dict[str, User]:
+        """
+        The User objects managed by the UserManager, keyed by user_id in insertion order.
+
+        They are loaded from storage on first access.
+
+        Returns:
+            Dict[str, User]: The managed users.
+        """
+        if self._users is None:
+            self._load_users()
+        return self._users
+
+    def _load_users(self) -> None:
+        """
+        Load the existing users from storage and assign their sequence numbers.
+
+        The trigram index is left to be built by the first search that needs it.
+        """
+        users: Dict[str, User] = {}
+        search_keys: Dict[str, Tuple[int, str, str]] = {}
+        for data in self.storage.load_users():
+            user = User._from_dict_fast(data)
+            search_keys[user.user_id] = (len(users), user._name_lower, user._id_lower)
+            users[user.user_id] = user
+        # Assigned last, so a failed load leaves nothing half built and is retried
+        # on the next access
+        self._search_keys = search_keys
+        self._next_seq = len(users)
+        self._users = users
 
     def add_user(self, name: str, user_id: str) -> None:
         """
@@ -118,11 +298,34 @@ class UserManager:
         Raises:
             ValueError: If a user with the same user_id already exists.
         """
-        if self.get_user_by_id(user_id):
+        if user_id in self.users:
             raise ValueError(f"User with ID {user_id} already exists")
         user = User(name, user_id)
-        self.users.append(user)
-        self._save_users()
+        self.users[user.user_id] = user
+        self._index_user(user)
+        self._invalidate_search()
+        self._mark_dirty("add", user)
+
+    def add_users(self, users: Iterable[Tuple[str, str]]) -> None:
+        """
+        Add several new users to the system, writing them to storage together.
+
+        Args:
+            users (Iterable[Tuple[str, str]]): The (name, user_id) pairs of the new users.
+
+        Raises:
+            ValueError: If a user_id already exists or is given more than once. No user is
+                added in that case.
+        """
+        users = list(users)
+        seen = set()
+        for _, user_id in users:
+            if user_id in self.users or user_id in seen:
+                raise ValueError(f"User with ID {user_id} already exists")
+            seen.add(user_id)
+        with self.buffered():
+            for name, user_id in users:
+                self.add_user(name, user_id)
 
     def get_user_by_id(self, user_id: str) -> Optional[User]:
         """
@@ -134,7 +337,7 @@ class UserManager:
         Returns:
             Optional[User]: The User object if found, else None.
         """
-        return next((user for user in self.users if user.user_id == user_id), None)
+        return self.users.get(user_id)
 
     def update_user(self, user_id: str, name: str = None) -> None:
         """
@@ -150,9 +353,14 @@ class UserManager:
         user = self.get_user_by_id(user_id)
         if not user:
             raise ValueError(f"User with ID {user_id} not found")
-        if name:
-            user.name = name
-        self._save_users()
+        if not name or name == user.name:
+            # Nothing changes, so there is nothing to reindex or write
+            return
+        seq = self._unindex_user(user_id)
+        user.name = name
+        self._index_user(user, seq)
+        self._invalidate_search()
+        self._mark_dirty("upd", user)
 
     def delete_user(self, user_id: str) -> None:
         """
@@ -164,11 +372,32 @@ class UserManager:
         Raises:
             ValueError: If the user with the given user_id is not found.
         """
-        user = self.get_user_by_id(user_id)
+        user = self.users.get(user_id)
         if not user:
             raise ValueError(f"User with ID {user_id} not found")
-        self.users.remove(user)
-        self._save_users()
+        self._unindex_user(user_id)
+        del self.users[user_id]
+        self._invalidate_search()
+        self._mark_dirty("del", user)
+
+    def delete_users(self, user_ids: Iterable[str]) -> None:
+        """
+        Delete several users from the system, writing the deletions to storage together.
+
+        Args:
+            user_ids (Iterable[str]): The IDs of the users to delete.
+
+        Raises:
+            ValueError: If a user with one of the given IDs is not found. No user is
+                deleted in that case.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        for user_id in user_ids:
+            if user_id not in self.users:
+                raise ValueError(f"User with ID {user_id} not found")
+        with self.buffered():
+            for user_id in user_ids:
+                self.delete_user(user_id)
 
     def list_users(self) -> List[User]:
         """
@@ -177,23 +406,214 @@ class UserManager:
         Returns:
             List[User]: A list of all User objects.
         """
-        return self.users
+        return list(self.users.values())
 
     def search_users(self, query: str) -> List[User]:
         """
         Search for users by name or user_id.
 
+        Queries of three or more characters only check the users that contain every
+        trigram of the query, found through the trigram index. Results are cached per
+        lower-cased query until the users change.
+
         Args:
             query (str): The search query string.
 
         Returns:
             List[User]: A list of User objects matching the search criteria.
         """
-        query = query.lower()
-        return [user for user in self.users if query in user.name.lower() or query in user.user_id.lower()]
+        return list(self._cached_search(query.lower(), self._gen))
+
+    def _search(self, query: str, gen: int) -> Tuple[User, ...]:
+        """
+        Search for users matching a lower-cased query.
+
+        Args:
+            query (str): The lower-cased search query string.
+            gen (int): The current generation, which only serves as part of the cache key.
+
+        Returns:
+            Tuple[User, ...]: The matching users, in the order they were added.
+        """
+        if len(query) < 3:
+            if not query or "\0" in query:
+                matches = []
+                for user in self.users.values():
+                    _, name_lower, id_lower = self._search_keys[user.user_id]
+                    if query in name_lower or query in id_lower:
+                        matches.append(user)
+                return tuple(matches)
+            return tuple(self._search_catalog().find(query))
+        trigram_index = self._get_trigram_index()
+        postings = [trigram_index.get(gram) for gram in _trigrams(query)]
+        if not all(postings):
+            return ()
+        hits = []
+        for user_id in set.intersection(*postings):
+            seq, name_lower, id_lower = self._search_keys[user_id]
+            if query in name_lower or query in id_lower:
+                hits.append((seq, user_id))
+        # Return matches in the order the users were added, as the full scan does
+        hits.sort()
+        return tuple(self.users[user_id] for _, user_id in hits)
+
+    def _invalidate_search(self) -> None:
+        """
+        Discard the cached search results and the packed catalog after the users have changed.
+
+        Results of earlier generations can never be returned again, so they are dropped
+        rather than left to age out of the cache.
+        """
+        self._gen += 1
+        self._catalog = None
+        self._cached_search.cache_clear()
+
+    def _search_catalog(self) -> PackedCatalog[User]:
+        """
+        Return the packed search text of all users, building it if the users have changed.
+
+        Returns:
+            PackedCatalog[User]: The lower-cased name and user_id of every user, in the
+            order they were added.
+        """
+        if self._catalog is None:
+            search_keys = self._search_keys
+
+            def text_of(user: User) -> str:
+                _, name_lower, id_lower = search_keys[user.user_id]
+                return f"{name_lower}\0{id_lower}"
+
+            self._catalog = PackedCatalog(self.users.values(), text_of)
+        return self._catalog
+
+    def _index_user(self, user: User, seq: Optional[int] = None) -> None:
+        """
+        Add a user to the search index.
+
+        Args:
+            user (User): The user to index.
+            seq (Optional[int]): The insertion sequence number of the user. A new one is
+                assigned if not given.
+        """
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+        self._search_keys[user.user_id] = (seq, user._name_lower, user._id_lower)
+        if self._trigram_index is not None:
+            self._add_trigrams(user.user_id, user._name_lower, user._id_lower)
+
+    def _add_trigrams(self, user_id: str, name_lower: str, id_lower: str) -> None:
+        """
+        Add a user's trigrams to the trigram index.
+
+        Args:
+            user_id (str): The ID of the user to add.
+            name_lower (str): The lower-cased name the user is indexed with.
+            id_lower (str): The lower-cased user_id the user is indexed with.
+        """
+        trigram_index = self._trigram_index
+        for gram in _trigrams(name_lower) | _trigrams(id_lower):
+            postings = trigram_index.get(gram)
+            if postings is None:
+                trigram_index[gram] = {user_id}
+            else:
+                postings.add(user_id)
+
+    def _get_trigram_index(self) -> Dict[str, Set[str]]:
+        """
+        Return the trigram index, building it from the current users on first use.
+
+        Returns:
+            Dict[str, Set[str]]: The user IDs keyed by trigram.
+        """
+        if self._trigram_index is None:
+            self._trigram_index = {}
+            for user_id, (_, name_lower, id_lower) in self._search_keys.items():
+                self._add_trigrams(user_id, name_lower, id_lower)
+        return self._trigram_index
+
+    def _unindex_user(self, user_id: str) -> int:
+        """
+        Remove a user from the search index.
+
+        The index entries are found through the search keys the user was indexed with,
+        so they are removed correctly even if the user's name has changed since.
+
+        Args:
+            user_id (str): The ID of the user to remove.
+
+        Returns:
+            int: The insertion sequence number the user was indexed with.
+        """
+        seq, name_lower, id_lower = self._search_keys[user_id]
+        if self._trigram_index is not None:
+            for gram in _trigrams(name_lower) | _trigrams(id_lower):
+                postings = self._trigram_index[gram]
+                postings.discard(user_id)
+                if not postings:
+                    del self._trigram_index[gram]
+        del self._search_keys[user_id]
+        return seq
+
+    @contextmanager
+    def buffered(self):
+        """
+        Context manager deferring user writes until the outermost buffered block exits.
+
+        All changes made inside the block are written together, and a user changed
+        several times is written only once.
+        """
+        self._buffer_depth += 1
+        try:
+            yield
+        finally:
+            self._buffer_depth -= 1
+            if self._buffer_depth == 0:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the pending user changes to storage, saving all users once the change log grows too large.
+        """
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        with self.storage.transaction():
+            for user_id, op in dirty.items():
+                if op in ("del", "readd"):
+                    self.storage.append_record("del", user_id)
+                if op == "readd":
+                    self.storage.append_encoded("add", user_id, self.users[user_id].to_json())
+                elif op != "del":
+                    self.storage.append_encoded(op, user_id, self.users[user_id].to_json())
+        if self.storage.needs_compaction():
+            self._save_users()
+
+    def _mark_dirty(self, op: str, user: User) -> None:
+        """
+        Record a pending change to a user, writing it right away unless inside a buffered block.
+
+        Args:
+            op (str): The kind of change: "add", "upd" or "del".
+            user (User): The changed user.
+        """
+        if op == "upd":
+            # An update does not override a pending add or delete of the same user
+            self._dirty.setdefault(user.user_id, op)
+        else:
+            pending = self._dirty.pop(user.user_id, None)
+            if op == "add" and pending in ("del", "readd"):
+                # Both entries are written, so replay moves the user to the end as
+                # the deletion and re-addition did in memory
+                op = "readd"
+            # Reinserted, so the change is written after those of users added meanwhile
+            self._dirty[user.user_id] = op
+        if not self._buffer_depth:
+            self.flush()
 
     def _save_users(self):
         """
         Save the current list of users to storage.
         """
-        self.storage.save_users([user.to_dict() for user in self.users])
+        self._dirty.clear()
+        self.storage.save_encoded_users(user.to_json() for user in self.users.values())